@@ -1,16 +1,441 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox, Menu, colorchooser
-from PIL import Image, ImageTk
+from PIL import Image, ImageTk, ImageSequence, ImageDraw, ImageChops
 import os
 import json
+import csv
+import struct
 import math
 import webbrowser
+import hashlib
+import tempfile
+import time
+from collections import OrderedDict
 
 # Determine the appropriate resampling filter.
 if hasattr(Image, "Resampling"):
     RESAMPLE_FILTER = Image.Resampling.LANCZOS
+    NEAREST_FILTER = Image.Resampling.NEAREST
+    BOX_FILTER = Image.Resampling.BOX
+    MEDIANCUT = Image.Quantize.MEDIANCUT
+    NO_DITHER = Image.Dither.NONE
 else:
     RESAMPLE_FILTER = Image.LANCZOS  # For older Pillow versions
+    NEAREST_FILTER = Image.NEAREST
+    BOX_FILTER = Image.BOX
+    MEDIANCUT = Image.MEDIANCUT
+    NO_DITHER = Image.NONE
+
+# Total pixels of zoomed preview bitmaps kept around while dragging the zoom slider
+# (about 256 MB of RGBA). The current zoom level is always kept, even if larger.
+ZOOM_CACHE_MAX_PIXELS = 64 * 1024 * 1024
+
+# Rows of a palette sheet converted to RGBA at a time when building preview mip levels.
+PALETTE_STRIP_ROWS = 256
+
+# Delay used to coalesce bursts of list edits into a single preview update.
+PREVIEW_DEBOUNCE_MS = 100
+
+# Image list thumbnails: pixel size, how many stay in memory, and where they are cached on disk.
+THUMBNAIL_SIZE = 48
+THUMBNAIL_MEMORY_LIMIT = 512
+THUMBNAIL_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".spritesheet_maker", "thumbnails")
+# The disk cache is pruned at startup, least recently used first, down to this many files.
+THUMBNAIL_CACHE_MAX_FILES = 20000
+
+# Default playback speed for the animation preview window.
+DEFAULT_ANIMATION_FPS = 12
+
+# Image list entries that live in memory rather than on disk.
+MEMORY_PREFIX = "memory://"
+
+# Opacity (0-255) of the previous/next frames drawn by the editor's onion skin.
+ONION_SKIN_ALPHA = 80
+
+def pick_zoom_filter(zoom):
+    # Integer upscales of pixel art are exact with nearest-neighbour; downscales
+    # average pixels with a box filter. Everything else keeps the smooth filter.
+    if zoom >= 1.0:
+        if float(zoom).is_integer():
+            return NEAREST_FILTER
+        return RESAMPLE_FILTER
+    return BOX_FILTER
+
+def to_rgba(img, transparency=None):
+    # Crops and resizes of a palette sheet may lose its info dict, so the
+    # transparency index is passed explicitly.
+    if img.mode == "RGBA":
+        return img
+    if transparency is not None:
+        img.info["transparency"] = transparency
+    return img.convert("RGBA")
+
+def reduce_half(img):
+    # Halves an image with a box filter. Palette sheets are converted a strip at a time
+    # so no full-size RGBA copy is ever created.
+    if img.mode == "P":
+        reduced = Image.new("RGBA", (img.width // 2, img.height // 2))
+        transparency = img.info.get("transparency")
+        for top in range(0, reduced.height * 2, PALETTE_STRIP_ROWS):
+            strip = img.crop((0, top, reduced.width * 2, min(reduced.height * 2, top + PALETTE_STRIP_ROWS)))
+            reduced.paste(reduce_half(to_rgba(strip, transparency)), (0, top // 2))
+        return reduced
+    if hasattr(img, "reduce"):
+        return img.reduce(2)
+    return img.resize((img.width // 2, img.height // 2), BOX_FILTER)
+
+def split_frame_ref(ref):
+    # Frames of animated sources are stored as "walk.gif#12"; plain paths have no frame index.
+    base, sep, frame = ref.rpartition("#")
+    if sep and frame.isdigit() and not os.path.exists(ref):
+        return base, int(frame)
+    return ref, None
+
+def expand_animated_source(path):
+    # Multi-frame GIF/APNG/WebP files become one virtual frame per entry. Only the
+    # headers are read here; the frames themselves are decoded when composing.
+    try:
+        with Image.open(path) as img:
+            frame_count = getattr(img, "n_frames", 1)
+    except Exception as e:
+        print(f"Error reading image {path}: {e}")
+        return [path]
+    if frame_count <= 1:
+        return [path]
+    return [f"{path}#{i}" for i in range(frame_count)]
+
+def sprite_filename(ref):
+    # Frames keep their source extension ("walk.gif#3" -> "walk_gif_003.png") so
+    # animations that share a stem do not collide.
+    path, frame = split_frame_ref(ref)
+    if frame is None:
+        return os.path.basename(path)
+    stem, ext = os.path.splitext(os.path.basename(path))
+    return f"{stem}_{ext.lstrip('.').lower()}_{frame:03d}.png"
+
+def unique_sprite_filename(name, order, used):
+    # Same-named sprites from different folders get their order appended, so metadata
+    # filenames stay unique and slicing never overwrites files.
+    if name in used:
+        stem, ext = os.path.splitext(name)
+        name = f"{stem}_{order}{ext}"
+    used.add(name)
+    return name
+
+#########################
+# Metadata Exporters
+#########################
+# All writers stream one sprite at a time without indentation so large atlases
+# stay small and fast to write and parse.
+COMPACT_JSON = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False)
+
+# Binary table layout: header (magic, version, sprite count, sheet size, cell size),
+# then one record per sprite followed by its UTF-8 filename.
+BINARY_METADATA_MAGIC = b"SSMB"
+BINARY_METADATA_VERSION = 1
+BINARY_HEADER = struct.Struct("<4sHIIIII")
+BINARY_RECORD = struct.Struct("<IiiIIIH")
+
+def write_default_metadata(f, info, sprites):
+    f.write('{"spritesheet_width":%d,"spritesheet_height":%d,"cell_width":%d,"cell_height":%d,"sprites":['
+            % (info["spritesheet_width"], info["spritesheet_height"], info["cell_width"], info["cell_height"]))
+    for i, sprite in enumerate(sprites):
+        if i:
+            f.write(",")
+        f.write(COMPACT_JSON.encode(sprite))
+    f.write("]}")
+
+def texturepacker_frame(sprite):
+    frame = {
+        "frame": {"x": sprite["x"], "y": sprite["y"], "w": sprite["width"], "h": sprite["height"]},
+        "rotated": False,
+        "trimmed": False,
+        "spriteSourceSize": {"x": 0, "y": 0, "w": sprite["width"], "h": sprite["height"]},
+        "sourceSize": {"w": sprite["width"], "h": sprite["height"]}
+    }
+    if "duration" in sprite:
+        frame["duration"] = sprite["duration"]
+    return frame
+
+def texturepacker_meta(info):
+    return COMPACT_JSON.encode({
+        "app": "SpriteSheet Maker",
+        "version": "1.0",
+        "image": info["image"],
+        "format": "RGBA8888",
+        "size": {"w": info["spritesheet_width"], "h": info["spritesheet_height"]},
+        "scale": "1"
+    })
+
+def write_texturepacker_hash(f, info, sprites):
+    f.write('{"frames":{')
+    seen = set()
+    for i, sprite in enumerate(sprites):
+        name = sprite["filename"]
+        if name in seen:
+            # Hash keys must be unique; repeated sprites get their order appended.
+            stem, ext = os.path.splitext(name)
+            name = f"{stem}_{sprite['order']}{ext}"
+        seen.add(name)
+        if i:
+            f.write(",")
+        f.write(COMPACT_JSON.encode(name))
+        f.write(":")
+        f.write(COMPACT_JSON.encode(texturepacker_frame(sprite)))
+    f.write('},"meta":')
+    f.write(texturepacker_meta(info))
+    f.write("}")
+
+def write_texturepacker_array(f, info, sprites):
+    f.write('{"frames":[')
+    for i, sprite in enumerate(sprites):
+        frame = {"filename": sprite["filename"]}
+        frame.update(texturepacker_frame(sprite))
+        if i:
+            f.write(",")
+        f.write(COMPACT_JSON.encode(frame))
+    f.write('],"meta":')
+    f.write(texturepacker_meta(info))
+    f.write("}")
+
+def write_binary_metadata(f, info, sprites):
+    f.write(BINARY_HEADER.pack(BINARY_METADATA_MAGIC, BINARY_METADATA_VERSION, len(sprites),
+                               info["spritesheet_width"], info["spritesheet_height"],
+                               info["cell_width"], info["cell_height"]))
+    for sprite in sprites:
+        name = sprite["filename"].encode("utf-8")
+        f.write(BINARY_RECORD.pack(sprite["order"], sprite["x"], sprite["y"], sprite["width"],
+                                   sprite["height"], int(round(sprite.get("duration") or 0)), len(name)))
+        f.write(name)
+
+def write_csv_metadata(f, info, sprites):
+    writer = csv.writer(f)
+    writer.writerow(["filename", "order", "x", "y", "width", "height", "duration"])
+    for sprite in sprites:
+        writer.writerow([sprite["filename"], sprite["order"], sprite["x"], sprite["y"],
+                         sprite["width"], sprite["height"], sprite.get("duration", "")])
+
+# Display name -> (file extension, binary output, writer)
+METADATA_FORMATS = {
+    "SpriteSheet Maker JSON": (".json", False, write_default_metadata),
+    "TexturePacker JSON (Hash)": (".json", False, write_texturepacker_hash),
+    "TexturePacker JSON (Array)": (".json", False, write_texturepacker_array),
+    "Binary Table": (".bin", True, write_binary_metadata),
+    "CSV": (".csv", False, write_csv_metadata),
+}
+DEFAULT_METADATA_FORMAT = "SpriteSheet Maker JSON"
+
+def write_metadata(path, format_name, info, sprites):
+    _, binary, writer = METADATA_FORMATS[format_name]
+    if binary:
+        atomic_write(path, lambda f: writer(f, info, sprites), "wb")
+    else:
+        atomic_write(path, lambda f: writer(f, info, sprites), "w", encoding="utf-8", newline="")
+
+def read_binary_metadata(f):
+    header = f.read(BINARY_HEADER.size)
+    magic, version, count = BINARY_HEADER.unpack(header)[:3]
+    if magic != BINARY_METADATA_MAGIC or version != BINARY_METADATA_VERSION:
+        raise ValueError("Unsupported binary metadata file")
+    sprites = []
+    for _ in range(count):
+        order, x, y, width, height, duration, name_length = BINARY_RECORD.unpack(f.read(BINARY_RECORD.size))
+        sprite = {"filename": f.read(name_length).decode("utf-8"), "order": order,
+                  "x": x, "y": y, "width": width, "height": height}
+        if duration:
+            sprite["duration"] = duration
+        sprites.append(sprite)
+    return sprites
+
+def read_csv_metadata(f):
+    sprites = []
+    for row in csv.DictReader(f):
+        sprites.append({
+            "filename": row.get("filename") or "sprite.png",
+            "x": int(row.get("x") or 0),
+            "y": int(row.get("y") or 0),
+            "width": int(row.get("width") or 0),
+            "height": int(row.get("height") or 0)
+        })
+    return sprites
+
+def read_texturepacker_frames(frames):
+    # Accepts both the hash (name -> frame) and array ([{filename, frame}]) layouts.
+    if isinstance(frames, dict):
+        frames = [dict(frame, filename=name) for name, frame in frames.items()]
+    sprites = []
+    for frame in frames:
+        rect = frame.get("frame", {})
+        sprites.append({
+            "filename": frame.get("filename", "sprite.png"),
+            "x": rect.get("x", 0),
+            "y": rect.get("y", 0),
+            "width": rect.get("w", 0),
+            "height": rect.get("h", 0)
+        })
+    return sprites
+
+def read_metadata(path):
+    # Detects the metadata format written by any of the exporters and returns the sprite list.
+    with open(path, "rb") as f:
+        if f.read(len(BINARY_METADATA_MAGIC)) == BINARY_METADATA_MAGIC:
+            f.seek(0)
+            return read_binary_metadata(f)
+    if os.path.splitext(path)[1].lower() == ".csv":
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            return read_csv_metadata(f)
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if "frames" in data:
+        return read_texturepacker_frames(data["frames"])
+    return data.get("sprites", [])
+
+#########################
+# Indexed Palette
+#########################
+class SharedPalette:
+    # One palette shared by every frame of an indexed sheet. Entry 0 is the
+    # background colour, which doubles as the transparency index.
+    def __init__(self, background=(0, 0, 0), colors=()):
+        self.colors = [tuple(background)]
+        self.index = {}
+        self.failure = None  # Why the last index_frame call returned None
+        for color in colors:
+            self.add_color(tuple(color))
+    
+    def add_color(self, color):
+        # Returns the palette index for an RGB colour, or None once all 256 entries are used.
+        if color not in self.index:
+            if len(self.colors) >= 256:
+                return None
+            self.index[color] = len(self.colors)
+            self.colors.append(color)
+        return self.index[color]
+    
+    def index_frame(self, img):
+        # Maps an RGBA frame onto the shared palette. Returns (P image, opacity mask),
+        # or None (with the reason in self.failure) if the frame has semi-transparent
+        # pixels or would push the palette past 256 colours.
+        alpha = img.getchannel("A")
+        if any(alpha.histogram()[1:255]):
+            # A single transparency index cannot represent partial alpha.
+            self.failure = "semi-transparent pixels"
+            return None
+        mask = alpha
+        rgb = img.convert("RGB")
+        # Hidden colours under transparent pixels must not use up palette entries.
+        rgb.paste(self.colors[0], mask=mask.point(lambda a: 255 - a))
+        if rgb.getcolors(256) is None:
+            self.failure = "more than 255 colours"
+            return None
+        # Median cut is exact for <= 256 colours, unlike quantizing against a fixed
+        # palette, so quantize locally and remap the local indices with a lookup table.
+        local = rgb.quantize(colors=256, method=MEDIANCUT, dither=NO_DITHER)
+        local_palette = local.getpalette()
+        lut = [0] * 256
+        for i, count in enumerate(local.histogram(mask=mask)):
+            if count:
+                index = self.add_color(tuple(local_palette[i * 3:i * 3 + 3]))
+                if index is None:
+                    self.failure = "more than 255 colours"
+                    return None
+                lut[i] = index
+        indices = Image.frombytes("L", img.size, local.tobytes()).point(lut)
+        return Image.frombytes("P", img.size, indices.tobytes()), mask
+    
+    def apply(self, img, transparent):
+        img.putpalette([value for color in self.colors for value in color])
+        if transparent:
+            img.info["transparency"] = 0
+        else:
+            img.info.pop("transparency", None)
+
+def save_indexed_image(img, fp, file_format):
+    # Indexed images are written as palette PNGs at the smallest bit depth that fits;
+    # other formats get the equivalent true-colour image.
+    if file_format == "PNG":
+        colors = len(img.getpalette()) // 3
+        bits = next(b for b in (1, 2, 4, 8) if colors <= 2 ** b)
+        img.save(fp, "PNG", bits=bits, optimize=True)
+    elif file_format == "JPEG":
+        img.convert("RGB").save(fp, file_format)
+    else:
+        img.convert("RGBA").save(fp, file_format)
+
+#########################
+# Incremental Export
+#########################
+# Fingerprints of the last export are kept next to the sheet so unchanged outputs
+# are neither re-encoded nor rewritten (keeping pipeline caches and uploads valid).
+EXPORT_MANIFEST_SUFFIX = ".manifest.json"
+FINGERPRINT_STRIP_ROWS = 256
+
+def image_fingerprint(img, file_format):
+    # Hashes the composed pixels in horizontal strips to avoid copying the whole sheet at once.
+    digest = hashlib.sha256(f"{img.mode}|{img.width}x{img.height}|{file_format}".encode("utf-8"))
+    if img.mode == "P":
+        digest.update(bytes(img.getpalette()))
+        digest.update(repr(img.info.get("transparency")).encode("utf-8"))
+    for top in range(0, img.height, FINGERPRINT_STRIP_ROWS):
+        digest.update(img.crop((0, top, img.width, min(img.height, top + FINGERPRINT_STRIP_ROWS))).tobytes())
+    return digest.hexdigest()
+
+def metadata_fingerprint(format_name, info, sprites):
+    digest = hashlib.sha256(format_name.encode("utf-8"))
+    digest.update(COMPACT_JSON.encode(info).encode("utf-8"))
+    for sprite in sprites:
+        digest.update(COMPACT_JSON.encode(sprite).encode("utf-8"))
+    return digest.hexdigest()
+
+def atomic_write(path, write, mode="wb", **open_kwargs):
+    # Writes through a temporary file in the same directory, then renames it into place,
+    # so readers never see a partially written output.
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=os.path.splitext(path)[1])
+    try:
+        with os.fdopen(fd, mode, **open_kwargs) as f:
+            write(f)
+        # mkstemp creates private files; give the output the permissions a plain open() would.
+        if os.path.exists(path):
+            os.chmod(temp_path, os.stat(path).st_mode & 0o777)
+        else:
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(temp_path, 0o666 & ~umask)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def load_export_manifest(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {"outputs": {}}
+    if not isinstance(manifest.get("outputs"), dict):
+        manifest["outputs"] = {}
+    return manifest
+
+def output_is_current(manifest, path, fingerprint):
+    # An output is reused only if its fingerprint matches and the file is untouched since.
+    entry = manifest["outputs"].get(os.path.basename(path))
+    if not entry or entry.get("fingerprint") != fingerprint:
+        return False
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return False
+    return entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns
+
+def record_output(manifest, path, fingerprint):
+    stat = os.stat(path)
+    manifest["outputs"][os.path.basename(path)] = {
+        "fingerprint": fingerprint,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns
+    }
 
 #########################
 # Main SpriteSheet Maker
@@ -20,15 +445,28 @@ class SpriteSheetMaker:
         self.master = master
         self.master.title("SpriteSheet Maker by Kavex")
         self.image_list = []  # List of file paths
+        # Images sent straight from the Pixel Art Editor, keyed by their "memory://" entry.
+        self.memory_images = {}
+        self.memory_counter = 0
         self.default_columns = 4  # Default columns set to at least 4
         self.zoom_factor = 1.0  # 1.0 = 100%
         
+        # Composed spritesheet plus its mip pyramid and recently used zoom levels.
+        self.spritesheet_image = None
+        self.mip_levels = []
+        self.zoom_cache = OrderedDict()
+        self.preview_job = None
+        
         # Background settings.
         self.transparent_bg = tk.BooleanVar(value=True)
         self.bg_color = "#ffffff"  # Default background color (if transparency is disabled)
         
-        # Option to export JSON metadata along with the spritesheet.
+        # Option to export metadata along with the spritesheet, and in which format.
         self.export_json_metadata = tk.BooleanVar(value=False)
+        self.metadata_format = tk.StringVar(value=DEFAULT_METADATA_FORMAT)
+        
+        # Compose and export the sheet as a palette image shared by all frames.
+        self.indexed_palette = tk.BooleanVar(value=False)
         
         self.build_menu()
         self.setup_widgets()
@@ -44,6 +482,7 @@ class SpriteSheetMaker:
         file_menu.add_separator()
         file_menu.add_command(label="Export Spritesheet", command=self.export_spritesheet)
         file_menu.add_command(label="Slice Spritesheet", command=self.open_slice_window)
+        file_menu.add_command(label="Animation Preview", command=self.open_animation_preview)
         file_menu.add_separator()
         file_menu.add_command(label="Pixel Art Editor", command=self.open_pixel_art_editor)
         file_menu.add_separator()
@@ -65,14 +504,9 @@ class SpriteSheetMaker:
         self.right_frame = tk.Frame(self.master)
         self.right_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True)
         
-        # Frame for the listbox with a scrollbar.
-        list_frame = tk.Frame(self.left_frame)
-        list_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-        self.listbox = tk.Listbox(list_frame, selectmode=tk.SINGLE, width=40)
-        self.listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        list_scroll = tk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.listbox.yview)
-        list_scroll.pack(side=tk.RIGHT, fill=tk.Y)
-        self.listbox.config(yscrollcommand=list_scroll.set)
+        # Virtualised thumbnail list (only the visible rows are drawn).
+        self.listbox = ThumbnailList(self.left_frame, loader=self.load_image, width=300)
+        self.listbox.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         
         # Buttons for list management.
         btn_frame = tk.Frame(self.left_frame)
@@ -115,9 +549,15 @@ class SpriteSheetMaker:
         self.bg_color_label = tk.Label(top_right, text=self.bg_color)
         self.bg_color_label.pack(side=tk.LEFT, padx=5)
         
-        # Checkbox for JSON metadata export.
-        self.json_export_cb = tk.Checkbutton(top_right, text="Export JSON Metadata", variable=self.export_json_metadata)
+        # Checkbox and format selector for metadata export.
+        self.json_export_cb = tk.Checkbutton(top_right, text="Export Metadata", variable=self.export_json_metadata)
         self.json_export_cb.pack(side=tk.LEFT, padx=5)
+        self.metadata_format_menu = tk.OptionMenu(top_right, self.metadata_format, *METADATA_FORMATS)
+        self.metadata_format_menu.pack(side=tk.LEFT, padx=5)
+        
+        # Checkbox for palette-indexed sheets.
+        self.indexed_cb = tk.Checkbutton(top_right, text="Indexed Palette", variable=self.indexed_palette, command=self.update_preview)
+        self.indexed_cb.pack(side=tk.LEFT, padx=5)
         
         # Create a frame for the preview canvas and its scrollbars.
         self.preview_frame = tk.Frame(self.right_frame)
@@ -153,178 +593,320 @@ class SpriteSheetMaker:
     def zoom_changed(self, value):
         try:
             self.zoom_factor = float(value) / 100.0
-            self.update_preview()
+            if self.spritesheet_image is not None:
+                # Zooming does not change the sheet, so only rescale the cached composite.
+                self.render_preview()
+            else:
+                self.update_preview()
         except Exception as e:
             print("Error in zoom_changed:", e)
     
     def add_image(self):
         file_paths = filedialog.askopenfilenames(title="Select Sprite Images",
-                                                 filetypes=[("Image Files", "*.png;*.jpg;*.jpeg;*.gif")])
+                                                 filetypes=[("Image Files", "*.png;*.apng;*.jpg;*.jpeg;*.gif;*.webp")])
         if file_paths:
             for path in file_paths:
-                self.image_list.append(path)
-                self.listbox.insert(tk.END, os.path.basename(path))
-            self.update_preview()
+                self.image_list.extend(expand_animated_source(path))
+            self.listbox.set_items(self.image_list)
+            self.listbox.see(len(self.image_list) - 1)
+            self.schedule_preview_update()
     
     def remove_image(self):
-        selected = self.listbox.curselection()
+        selected = set(self.listbox.curselection())
         if selected:
-            index = selected[0]
-            self.listbox.delete(index)
-            del self.image_list[index]
-            self.update_preview()
+            self.image_list = [path for i, path in enumerate(self.image_list) if i not in selected]
+            self.prune_memory_images()
+            self.listbox.set_items(self.image_list)
+            self.schedule_preview_update()
     
     def clear_images(self):
-        self.listbox.delete(0, tk.END)
         self.image_list = []
+        self.prune_memory_images()
+        self.listbox.set_items(self.image_list)
         self.update_preview()
     
+    def add_memory_images(self, images, name):
+        # Appends in-memory images (e.g. editor frames) without a save/reload round trip.
+        self.memory_counter += 1
+        for i, img in enumerate(images):
+            # The send number is part of the basename so metadata filenames stay unique.
+            ref = f"{MEMORY_PREFIX}{name}-{self.memory_counter}_frame_{i:03d}.png"
+            self.memory_images[ref] = img
+            self.image_list.append(ref)
+        self.listbox.set_items(self.image_list)
+        self.listbox.see(len(self.image_list) - 1)
+        self.schedule_preview_update()
+    
+    def prune_memory_images(self):
+        in_use = set(self.image_list)
+        self.memory_images = {ref: img for ref, img in self.memory_images.items() if ref in in_use}
+    
     def move_up(self):
+        # Moves every selected entry up by one as a block.
         selected = self.listbox.curselection()
-        if selected:
-            index = selected[0]
-            if index > 0:
+        if selected and selected[0] > 0:
+            for index in selected:
                 self.image_list[index], self.image_list[index-1] = self.image_list[index-1], self.image_list[index]
-                text = self.listbox.get(index)
-                self.listbox.delete(index)
-                self.listbox.insert(index-1, text)
-                self.listbox.selection_set(index-1)
-                self.update_preview()
+            self.listbox.set_items(self.image_list, [index - 1 for index in selected])
+            self.listbox.see(selected[0] - 1)
+            self.schedule_preview_update()
     
     def move_down(self):
+        # Moves every selected entry down by one as a block.
         selected = self.listbox.curselection()
-        if selected:
-            index = selected[0]
-            if index < self.listbox.size() - 1:
+        if selected and selected[-1] < len(self.image_list) - 1:
+            for index in reversed(selected):
                 self.image_list[index], self.image_list[index+1] = self.image_list[index+1], self.image_list[index]
-                text = self.listbox.get(index)
-                self.listbox.delete(index)
-                self.listbox.insert(index+1, text)
-                self.listbox.selection_set(index+1)
-                self.update_preview()
+            self.listbox.set_items(self.image_list, [index + 1 for index in selected])
+            self.listbox.see(selected[-1] + 1)
+            self.schedule_preview_update()
     
-    def update_preview(self):
-        if not self.image_list:
-            self.preview_canvas.delete("all")
-            self.size_label.config(text="Size: 0 x 0")
-            return
-        
+    def schedule_preview_update(self):
+        # Coalesce bursts of list edits (repeated moves, bulk removes) into one recomposite.
+        if self.preview_job is not None:
+            self.master.after_cancel(self.preview_job)
+        self.preview_job = self.master.after(PREVIEW_DEBOUNCE_MS, self.run_scheduled_preview)
+    
+    def run_scheduled_preview(self):
+        self.preview_job = None
+        self.update_preview()
+    
+    def load_image(self, path):
+        return self.load_frame(path)[0]
+    
+    def open_source(self, path, open_sources=None):
+        # Animated sources stay open for the whole compose pass so consecutive
+        # frames are reached by seeking forward instead of re-decoding from the start.
+        if open_sources is not None and path in open_sources:
+            return open_sources[path]
+        source = Image.open(path)
+        if open_sources is not None:
+            open_sources[path] = source
+        return source
+    
+    def frame_size(self, ref, open_sources=None):
+        if ref in self.memory_images:
+            return self.memory_images[ref].size
+        path, frame = split_frame_ref(ref)
+        if frame is None:
+            with Image.open(path) as img:
+                return img.size
+        return self.open_source(path, open_sources).size
+    
+    def load_frame(self, ref, open_sources=None):
+        # Returns the RGBA image for an entry and its frame duration in ms (None for stills).
+        if ref in self.memory_images:
+            # Hand out a copy so callers (e.g. thumbnailing) cannot modify the stored frame.
+            return self.memory_images[ref].copy(), None
+        path, frame = split_frame_ref(ref)
+        if frame is None:
+            with Image.open(path) as img:
+                return img.convert("RGBA"), None
+        source = self.open_source(path, open_sources)
+        if open_sources is not None and frame < source.tell():
+            # Some readers (e.g. APNG) cannot seek backwards once advanced, so start over.
+            source.close()
+            del open_sources[path]
+            source = self.open_source(path, open_sources)
+        try:
+            img = ImageSequence.Iterator(source)[frame]
+            # WebP only updates info["duration"] when the frame is decoded, not on seek.
+            rgba = img.convert("RGBA")
+            duration = img.info.get("duration")
+            if duration is not None:
+                # APNG reports float milliseconds; metadata always uses whole milliseconds.
+                duration = int(round(duration))
+            return rgba, duration
+        finally:
+            if open_sources is None:
+                source.close()
+    
+    def compose_spritesheet(self, indexed=None):
+        # Composes the sheet in two passes: cell sizes come from image headers, then
+        # each frame is decoded and pasted one at a time so only the sheet stays in memory.
+        # In indexed mode the sheet is a "P" image built against one shared palette.
+        if indexed is None:
+            indexed = self.indexed_palette.get()
         try:
             cols = int(self.columns_var.get())
         except ValueError:
             cols = 1
         
-        images = []
-        for path in self.image_list:
-            try:
-                img = Image.open(path).convert("RGBA")
-                images.append(img)
-            except Exception as e:
-                print(f"Error loading image {path}: {e}")
+        open_sources = {}
+        try:
+            entries = []
+            for path in self.image_list:
+                try:
+                    entries.append((path, self.frame_size(path, open_sources)))
+                except Exception as e:
+                    print(f"Error loading image {path}: {e}")
+            
+            if not entries:
+                return None
+            
+            cell_width = max(size[0] for _, size in entries)
+            cell_height = max(size[1] for _, size in entries)
+            rows = math.ceil(len(entries) / cols)
+            sheet_width = cell_width * cols
+            sheet_height = cell_height * rows
+            
+            if self.transparent_bg.get():
+                bg = (0, 0, 0, 0)
+            else:
+                r = int(self.bg_color[1:3], 16)
+                g = int(self.bg_color[3:5], 16)
+                b = int(self.bg_color[5:7], 16)
+                bg = (r, g, b, 255)
+            
+            if indexed:
+                palette = SharedPalette(bg[:3])
+                spritesheet = Image.new("P", (sheet_width, sheet_height), 0)
+            else:
+                palette = None
+                spritesheet = Image.new("RGBA", (sheet_width, sheet_height), bg)
+            metadata = []
+            used_filenames = set()
+            idx = 0
+            for path, _ in entries:
+                try:
+                    img, duration = self.load_frame(path, open_sources)
+                except Exception as e:
+                    print(f"Error loading image {path}: {e}")
+                    continue
+                row = idx // cols
+                col = idx % cols
+                x = col * cell_width
+                y = row * cell_height
+                if palette is not None:
+                    converted = palette.index_frame(img)
+                    if converted is None:
+                        if palette.failure == "semi-transparent pixels":
+                            print(f"Image {path} has semi-transparent pixels, which an indexed palette cannot keep; composing in RGBA instead.")
+                        else:
+                            print("More than 255 colours across all frames; composing in RGBA instead.")
+                        return self.compose_spritesheet(indexed=False)
+                    indices, mask = converted
+                    spritesheet.paste(indices, (x, y), mask)
+                else:
+                    spritesheet.paste(img, (x, y), img)
+                sprite = {
+                    "filename": unique_sprite_filename(sprite_filename(path), idx, used_filenames),
+                    "order": idx,
+                    "width": img.width,
+                    "height": img.height,
+                    "x": x,
+                    "y": y
+                }
+                if duration is not None:
+                    sprite["duration"] = duration
+                metadata.append(sprite)
+                idx += 1
+        finally:
+            for source in open_sources.values():
+                source.close()
+        
+        if not metadata:
+            return None
+        if palette is not None:
+            palette.apply(spritesheet, self.transparent_bg.get())
+        return spritesheet, metadata, cell_width, cell_height
+    
+    def clear_preview(self):
+        self.preview_canvas.delete("all")
+        self.size_label.config(text="Size: 0 x 0")
+        self.spritesheet_image = None
+        self.mip_levels = []
+        self.zoom_cache.clear()
+    
+    def update_preview(self):
+        if not self.image_list:
+            self.clear_preview()
+            return
         
-        if not images:
-            self.preview_canvas.delete("all")
-            self.size_label.config(text="Size: 0 x 0")
+        result = self.compose_spritesheet()
+        if result is None:
+            self.clear_preview()
             return
         
-        cell_width = max(img.width for img in images)
-        cell_height = max(img.height for img in images)
-        rows = math.ceil(len(images) / cols)
-        sheet_width = cell_width * cols
-        sheet_height = cell_height * rows
+        spritesheet, self.metadata, self.cell_width, self.cell_height = result
+        if spritesheet.mode == "P":
+            colors = len(spritesheet.getpalette()) // 3
+            self.size_label.config(text=f"Size: {spritesheet.width} x {spritesheet.height} ({colors} colours)")
+        else:
+            self.size_label.config(text=f"Size: {spritesheet.width} x {spritesheet.height}")
         
-        self.size_label.config(text=f"Size: {sheet_width} x {sheet_height}")
+        # A new composite invalidates every cached zoom level.
+        self.spritesheet_image = spritesheet
+        self.mip_levels = [spritesheet]
+        self.zoom_cache.clear()
+        self.render_preview()
+    
+    def get_mip_level(self, zoom):
+        # Return the smallest power-of-two reduction that is still at least as
+        # large as the requested zoom, building the pyramid lazily.
+        level = 0
+        while zoom <= 0.5 / (2 ** level):
+            level += 1
+        while len(self.mip_levels) <= level:
+            previous = self.mip_levels[-1]
+            if previous.width < 2 or previous.height < 2:
+                return previous
+            self.mip_levels.append(reduce_half(previous))
+        return self.mip_levels[level]
+    
+    def get_zoomed_preview(self, zoom):
+        key = round(zoom * 100)
+        if key in self.zoom_cache:
+            self.zoom_cache.move_to_end(key)
+            return self.zoom_cache[key]
         
-        if self.transparent_bg.get():
-            bg = (0, 0, 0, 0)
+        sheet = self.mip_levels[0]
+        zoomed_width = max(1, int(sheet.width * zoom))
+        zoomed_height = max(1, int(sheet.height * zoom))
+        if zoom < 1.0:
+            source = self.get_mip_level(zoom)
+        else:
+            source = sheet
+        resample = pick_zoom_filter(zoom)
+        transparency = source.info.get("transparency")
+        if resample != NEAREST_FILTER:
+            # Smooth filters need true colour; this copy is dropped once the preview is built.
+            source = to_rgba(source, transparency)
+        # Palette sheets are scaled in place and only the zoomed result is converted.
+        if source.size == (zoomed_width, zoomed_height):
+            zoomed = source
         else:
-            r = int(self.bg_color[1:3], 16)
-            g = int(self.bg_color[3:5], 16)
-            b = int(self.bg_color[5:7], 16)
-            bg = (r, g, b, 255)
-        
-        self.cell_width = cell_width
-        self.cell_height = cell_height
-        
-        spritesheet = Image.new("RGBA", (sheet_width, sheet_height), bg)
-        self.metadata = []
-        for idx, img in enumerate(images):
-            row = idx // cols
-            col = idx % cols
-            x = col * cell_width
-            y = row * cell_height
-            spritesheet.paste(img, (x, y), img)
-            self.metadata.append({
-                "filename": os.path.basename(self.image_list[idx]),
-                "order": idx,
-                "width": img.width,
-                "height": img.height,
-                "x": x,
-                "y": y
-            })
-        
-        zoomed_width = int(sheet_width * self.zoom_factor)
-        zoomed_height = int(sheet_height * self.zoom_factor)
-        spritesheet_zoomed = spritesheet.resize((zoomed_width, zoomed_height), RESAMPLE_FILTER)
-        
-        self.preview_image = ImageTk.PhotoImage(spritesheet_zoomed)
+            zoomed = source.resize((zoomed_width, zoomed_height), resample)
+        zoomed = to_rgba(zoomed, transparency)
+        
+        photo = ImageTk.PhotoImage(zoomed)
+        self.zoom_cache[key] = photo
+        cached_pixels = sum(cached.width() * cached.height() for cached in self.zoom_cache.values())
+        while cached_pixels > ZOOM_CACHE_MAX_PIXELS and len(self.zoom_cache) > 1:
+            _, evicted = self.zoom_cache.popitem(last=False)
+            cached_pixels -= evicted.width() * evicted.height()
+        return photo
+    
+    def render_preview(self):
+        if self.spritesheet_image is None:
+            return
+        self.preview_image = self.get_zoomed_preview(self.zoom_factor)
         self.preview_canvas.delete("all")
         self.preview_canvas.create_image(0, 0, anchor="nw", image=self.preview_image)
-        self.preview_canvas.config(scrollregion=(0, 0, zoomed_width, zoomed_height))
-        self.spritesheet_image = spritesheet
+        self.preview_canvas.config(scrollregion=(0, 0, self.preview_image.width(), self.preview_image.height()))
     
     def export_spritesheet(self):
         if not self.image_list:
             messagebox.showwarning("Warning", "No images to export")
             return
         
-        try:
-            cols = int(self.columns_var.get())
-        except ValueError:
-            cols = 1
-        
-        images = []
-        for path in self.image_list:
-            try:
-                img = Image.open(path).convert("RGBA")
-                images.append(img)
-            except Exception as e:
-                print(f"Error loading image {path}: {e}")
-        
-        if not images:
+        result = self.compose_spritesheet()
+        if result is None:
             messagebox.showwarning("Warning", "No valid images to export")
             return
         
-        cell_width = max(img.width for img in images)
-        cell_height = max(img.height for img in images)
-        rows = math.ceil(len(images) / cols)
-        sheet_width = cell_width * cols
-        sheet_height = cell_height * rows
-        
-        if self.transparent_bg.get():
-            bg = (0, 0, 0, 0)
-        else:
-            r = int(self.bg_color[1:3], 16)
-            g = int(self.bg_color[3:5], 16)
-            b = int(self.bg_color[5:7], 16)
-            bg = (r, g, b, 255)
-        
-        spritesheet = Image.new("RGBA", (sheet_width, sheet_height), bg)
-        metadata = []
-        for idx, img in enumerate(images):
-            row = idx // cols
-            col = idx % cols
-            x = col * cell_width
-            y = row * cell_height
-            spritesheet.paste(img, (x, y), img)
-            metadata.append({
-                "filename": os.path.basename(self.image_list[idx]),
-                "order": idx,
-                "width": img.width,
-                "height": img.height,
-                "x": x,
-                "y": y
-            })
+        spritesheet, metadata, cell_width, cell_height = result
+        sheet_width, sheet_height = spritesheet.size
         
         file_path = filedialog.asksaveasfilename(
             defaultextension=".png",
@@ -352,20 +934,52 @@ class SpriteSheetMaker:
             else:
                 file_format = "PNG"
             try:
-                spritesheet.save(file_path, file_format)
-                messagebox.showinfo("Success", f"Spritesheet saved to {file_path}")
+                def write_sheet(f):
+                    if spritesheet.mode == "P":
+                        save_indexed_image(spritesheet, f, file_format)
+                    else:
+                        spritesheet.save(f, file_format)
+                
+                # Each output: (path, fingerprint of its content, writer).
+                outputs = [(file_path, image_fingerprint(spritesheet, file_format),
+                            lambda: atomic_write(file_path, write_sheet))]
                 if self.export_json_metadata.get():
-                    metadata_dict = {
+                    info = {
+                        "image": os.path.basename(file_path),
                         "spritesheet_width": sheet_width,
                         "spritesheet_height": sheet_height,
                         "cell_width": cell_width,
-                        "cell_height": cell_height,
-                        "sprites": metadata
+                        "cell_height": cell_height
                     }
-                    json_path = os.path.splitext(file_path)[0] + ".json"
-                    with open(json_path, 'w') as f:
-                        json.dump(metadata_dict, f, indent=4)
-                    messagebox.showinfo("Success", f"JSON metadata saved to {json_path}")
+                    format_name = self.metadata_format.get()
+                    metadata_path = os.path.splitext(file_path)[0] + METADATA_FORMATS[format_name][0]
+                    outputs.append((metadata_path, metadata_fingerprint(format_name, info, metadata),
+                                    lambda: write_metadata(metadata_path, format_name, info, metadata)))
+                
+                manifest_path = os.path.splitext(file_path)[0] + EXPORT_MANIFEST_SUFFIX
+                manifest = load_export_manifest(manifest_path)
+                changed = []
+                unchanged = []
+                for path, fingerprint, write in outputs:
+                    if output_is_current(manifest, path, fingerprint):
+                        unchanged.append(path)
+                        continue
+                    write()
+                    record_output(manifest, path, fingerprint)
+                    changed.append(path)
+                
+                # The manifest also tells downstream builds which outputs this export touched.
+                changed_names = [os.path.basename(path) for path in changed]
+                if changed or manifest.get("changed") != changed_names:
+                    manifest["changed"] = changed_names
+                    atomic_write(manifest_path, lambda f: f.write(COMPACT_JSON.encode(manifest)), "w", encoding="utf-8")
+                
+                report = []
+                if changed:
+                    report.append("Written:\n" + "\n".join(changed))
+                if unchanged:
+                    report.append("Unchanged (skipped):\n" + "\n".join(unchanged))
+                messagebox.showinfo("Success", "\n\n".join(report))
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to save spritesheet: {e}")
     
@@ -375,6 +989,8 @@ class SpriteSheetMaker:
             self.columns_var.set(self.default_columns)
     
     def save_project(self):
+        if self.memory_images:
+            messagebox.showwarning("Warning", "Frames sent from the Pixel Art Editor are only kept in memory and will not be saved with the project.")
         project_data = {
             "image_list": self.image_list,
             "columns": self.columns_var.get()
@@ -391,10 +1007,9 @@ class SpriteSheetMaker:
         if file_path:
             with open(file_path, 'r') as f:
                 project_data = json.load(f)
-            self.image_list = project_data.get("image_list", [])
-            self.listbox.delete(0, tk.END)
-            for path in self.image_list:
-                self.listbox.insert(tk.END, os.path.basename(path))
+            self.image_list = [path for path in project_data.get("image_list", []) if not path.startswith(MEMORY_PREFIX)]
+            self.prune_memory_images()
+            self.listbox.set_items(self.image_list)
             self.columns_var.set(project_data.get("columns", self.default_columns))
             self.update_preview()
     
@@ -423,12 +1038,12 @@ class SpriteSheetMaker:
         
         frame2 = tk.Frame(self.slice_window)
         frame2.pack(fill=tk.X, padx=5, pady=5)
-        self.json_checkbox = tk.Checkbutton(frame2, text="Use JSON metadata", variable=self.use_json_metadata, command=self.toggle_slice_options)
+        self.json_checkbox = tk.Checkbutton(frame2, text="Use metadata file", variable=self.use_json_metadata, command=self.toggle_slice_options)
         self.json_checkbox.pack(side=tk.LEFT)
         
         self.json_frame = tk.Frame(self.slice_window)
         self.json_frame.pack(fill=tk.X, padx=5, pady=5)
-        tk.Label(self.json_frame, text="Select JSON file:").pack(side=tk.LEFT)
+        tk.Label(self.json_frame, text="Select metadata file:").pack(side=tk.LEFT)
         tk.Button(self.json_frame, text="Browse", command=self.select_slice_json).pack(side=tk.LEFT, padx=5)
         tk.Label(self.json_frame, textvariable=self.slice_json_path).pack(side=tk.LEFT)
         
@@ -467,8 +1082,11 @@ class SpriteSheetMaker:
             self.slice_image_path.set(path)
     
     def select_slice_json(self):
-        path = filedialog.askopenfilename(title="Select JSON Metadata File",
-                                          filetypes=[("JSON files", "*.json")])
+        path = filedialog.askopenfilename(title="Select Metadata File",
+                                          filetypes=[("Metadata files", "*.json;*.bin;*.csv"),
+                                                     ("JSON files", "*.json"),
+                                                     ("Binary tables", "*.bin"),
+                                                     ("CSV files", "*.csv")])
         if path:
             self.slice_json_path.set(path)
     
@@ -490,18 +1108,16 @@ class SpriteSheetMaker:
         
         if self.use_json_metadata.get():
             if not self.slice_json_path.get():
-                messagebox.showwarning("Warning", "No JSON metadata file selected")
+                messagebox.showwarning("Warning", "No metadata file selected")
                 return
             try:
-                with open(self.slice_json_path.get(), 'r') as f:
-                    data = json.load(f)
+                sprites = read_metadata(self.slice_json_path.get())
             except Exception as e:
-                messagebox.showerror("Error", f"Failed to load JSON metadata: {e}")
+                messagebox.showerror("Error", f"Failed to load metadata: {e}")
                 return
             
-            sprites = data.get("sprites", [])
             if not sprites:
-                messagebox.showwarning("Warning", "JSON metadata does not contain sprite data")
+                messagebox.showwarning("Warning", "Metadata does not contain sprite data")
                 return
             
             for sprite in sprites:
@@ -539,15 +1155,361 @@ class SpriteSheetMaker:
             messagebox.showinfo("Success", f"Slicing completed. {count} tiles saved.")
     
     def open_pixel_art_editor(self):
-        PixelArtEditor(self.master)
+        PixelArtEditor(self.master, self)
+    
+    def open_animation_preview(self):
+        # Flush a pending debounced update so the window never plays a stale sheet.
+        if self.preview_job is not None:
+            self.master.after_cancel(self.preview_job)
+            self.preview_job = None
+            self.update_preview()
+        if self.spritesheet_image is None:
+            self.update_preview()
+        if self.spritesheet_image is None:
+            messagebox.showwarning("Warning", "No images to animate")
+            return
+        AnimationPreview(self.master, self.spritesheet_image, self.metadata)
+
+##################################
+# Virtualised Thumbnail List
+##################################
+def thumbnail_key(path):
+    # Thumbnails are keyed on the file's location, size and modification time, so
+    # editing a sprite on disk produces a fresh thumbnail. None for entries not on disk.
+    try:
+        stat = os.stat(split_frame_ref(path)[0])
+    except OSError:
+        return None
+    return f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}|{THUMBNAIL_SIZE}"
+
+def thumbnail_cache_path(key):
+    return os.path.join(THUMBNAIL_CACHE_DIR, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".png")
+
+def prune_thumbnail_cache():
+    # Thumbnails touch their file's mtime on use, so the oldest mtimes are the least recently used.
+    try:
+        entries = [entry for entry in os.scandir(THUMBNAIL_CACHE_DIR) if entry.is_file() and entry.name.endswith(".png")]
+    except OSError:
+        return
+    if len(entries) <= THUMBNAIL_CACHE_MAX_FILES:
+        return
+    entries.sort(key=lambda entry: entry.stat().st_mtime)
+    for entry in entries[:len(entries) - THUMBNAIL_CACHE_MAX_FILES]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+class ThumbnailList(tk.Frame):
+    def __init__(self, master, loader, width=300):
+        super().__init__(master)
+        self.loader = loader  # Callable returning an RGBA image for an entry
+        self.items = []
+        self.selection = set()
+        self.anchor = None
+        self.row_height = THUMBNAIL_SIZE + 6
+        prune_thumbnail_cache()
+        
+        # In-memory thumbnails (bounded LRU) and the entries still waiting to be generated.
+        self.thumbnails = OrderedDict()
+        self.pending = []
+        self.pending_job = None
+        self.redraw_job = None
+        
+        self.canvas = tk.Canvas(self, width=width, bg="white", highlightthickness=0)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar = tk.Scrollbar(self, orient=tk.VERTICAL, command=self.canvas.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas.config(yscrollcommand=self.on_scroll, yscrollincrement=self.row_height)
+        
+        self.canvas.bind("<Configure>", lambda event: self.schedule_redraw())
+        self.canvas.bind("<Button-1>", self.on_click)
+        self.canvas.bind("<Control-Button-1>", self.on_ctrl_click)
+        self.canvas.bind("<Shift-Button-1>", self.on_shift_click)
+        self.canvas.bind("<MouseWheel>", self.on_mousewheel)
+        self.canvas.bind("<Button-4>", lambda event: self.canvas.yview_scroll(-3, "units"))
+        self.canvas.bind("<Button-5>", lambda event: self.canvas.yview_scroll(3, "units"))
+    
+    def set_items(self, items, selection=()):
+        self.items = list(items)
+        self.selection = {i for i in selection if 0 <= i < len(self.items)}
+        self.anchor = min(self.selection) if self.selection else None
+        width = self.canvas.winfo_width()
+        self.canvas.config(scrollregion=(0, 0, width, len(self.items) * self.row_height))
+        self.schedule_redraw()
+    
+    def curselection(self):
+        return tuple(sorted(self.selection))
+    
+    def see(self, index):
+        if not self.items:
+            return
+        top = self.canvas.canvasy(0)
+        bottom = top + self.canvas.winfo_height()
+        y = index * self.row_height
+        if y < top or y + self.row_height > bottom:
+            self.canvas.yview_moveto(max(0, y - self.row_height) / (len(self.items) * self.row_height))
+    
+    def on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self.schedule_redraw()
+    
+    def on_mousewheel(self, event):
+        self.canvas.yview_scroll(-3 if event.delta > 0 else 3, "units")
+    
+    def index_at(self, event):
+        index = int(self.canvas.canvasy(event.y) // self.row_height)
+        if 0 <= index < len(self.items):
+            return index
+        return None
+    
+    def on_click(self, event):
+        index = self.index_at(event)
+        if index is None:
+            return
+        self.selection = {index}
+        self.anchor = index
+        self.schedule_redraw()
+    
+    def on_ctrl_click(self, event):
+        index = self.index_at(event)
+        if index is None:
+            return
+        self.selection ^= {index}
+        self.anchor = index
+        self.schedule_redraw()
+    
+    def on_shift_click(self, event):
+        index = self.index_at(event)
+        if index is None:
+            return
+        if self.anchor is None:
+            self.anchor = index
+        low, high = sorted((self.anchor, index))
+        self.selection = set(range(low, high + 1))
+        self.schedule_redraw()
+    
+    def schedule_redraw(self):
+        if self.redraw_job is None:
+            self.redraw_job = self.after_idle(self.redraw)
+    
+    def redraw(self):
+        self.redraw_job = None
+        self.canvas.delete("all")
+        if not self.items:
+            return
+        
+        # Only create canvas items for the rows currently in view.
+        width = self.canvas.winfo_width()
+        top = self.canvas.canvasy(0)
+        first = max(0, int(top // self.row_height))
+        last = min(len(self.items), int((top + self.canvas.winfo_height()) // self.row_height) + 1)
+        
+        self.pending = []
+        for index in range(first, last):
+            path = self.items[index]
+            y = index * self.row_height
+            if index in self.selection:
+                self.canvas.create_rectangle(0, y, width, y + self.row_height, fill="#cce0ff", outline="")
+            # Entries that are not on disk (e.g. in-memory frames) are keyed on their ref alone.
+            key = thumbnail_key(path)
+            thumb = self.thumbnails.get(key or path)
+            if thumb is not None:
+                self.thumbnails.move_to_end(key or path)
+                self.canvas.create_image(3 + THUMBNAIL_SIZE // 2, y + self.row_height // 2, image=thumb)
+            else:
+                self.canvas.create_rectangle(3, y + 3, 3 + THUMBNAIL_SIZE, y + 3 + THUMBNAIL_SIZE, outline="#cccccc")
+                if (path, key) not in self.pending:
+                    self.pending.append((path, key))
+            self.canvas.create_text(THUMBNAIL_SIZE + 10, y + self.row_height // 2, anchor="w",
+                                    text=f"{index + 1}. {os.path.basename(path)}")
+        
+        if self.pending and self.pending_job is None:
+            self.pending_job = self.after(1, self.process_pending)
+    
+    def process_pending(self):
+        # Generate a few thumbnails per tick so scrolling stays responsive.
+        self.pending_job = None
+        for _ in range(8):
+            if not self.pending:
+                break
+            path, key = self.pending.pop(0)
+            self.thumbnails[key or path] = self.make_thumbnail(path, key)
+            if len(self.thumbnails) > THUMBNAIL_MEMORY_LIMIT:
+                self.thumbnails.popitem(last=False)
+        self.schedule_redraw()
+    
+    def make_thumbnail(self, path, key):
+        cache_path = thumbnail_cache_path(key) if key else None
+        thumb = None
+        if cache_path and os.path.exists(cache_path):
+            try:
+                thumb = Image.open(cache_path)
+                thumb.load()
+            except Exception:
+                thumb = None
+            else:
+                try:
+                    os.utime(cache_path)
+                except OSError:
+                    pass
+        if thumb is None:
+            try:
+                thumb = self.loader(path)
+                thumb.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE), BOX_FILTER)
+            except Exception as e:
+                print(f"Error creating thumbnail for {path}: {e}")
+                thumb = Image.new("RGBA", (THUMBNAIL_SIZE, THUMBNAIL_SIZE), (0, 0, 0, 0))
+                cache_path = None
+            if cache_path:
+                try:
+                    os.makedirs(THUMBNAIL_CACHE_DIR, exist_ok=True)
+                    thumb.save(cache_path, "PNG")
+                except Exception as e:
+                    print(f"Error caching thumbnail for {path}: {e}")
+        return ImageTk.PhotoImage(thumb)
+
+##################################
+# Animation Playback Preview
+##################################
+class AnimationPreview:
+    def __init__(self, master, spritesheet, metadata):
+        self.window = tk.Toplevel(master)
+        self.window.title("Animation Preview")
+        # Frames are cut from the already composed sheet; source files are never reopened.
+        # Palette sheets stay indexed; only the cropped frames are converted.
+        self.spritesheet = spritesheet
+        self.sprites = sorted(metadata, key=lambda sprite: sprite["order"])
+        self.frame_cache = {}  # zoom -> list of PhotoImages, built once per zoom level
+        self.frame_index = 0
+        self.playing = False
+        self.play_job = None
+        self.next_tick = 0.0
+        self.fps_var = tk.IntVar(value=DEFAULT_ANIMATION_FPS)
+        self.zoom_var = tk.IntVar(value=2)
+        # Frames imported from animated sources carry their own durations (ms).
+        self.has_durations = any("duration" in sprite for sprite in self.sprites)
+        self.use_durations = tk.BooleanVar(value=self.has_durations)
+        
+        self.create_widgets()
+        self.zoom_changed()
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+    
+    def create_widgets(self):
+        toolbar = tk.Frame(self.window)
+        toolbar.pack(side=tk.TOP, fill=tk.X)
+        self.play_button = tk.Button(toolbar, text="Play", width=6, command=self.toggle_play)
+        self.play_button.pack(side=tk.LEFT, padx=2)
+        tk.Button(toolbar, text="<", command=lambda: self.step(-1)).pack(side=tk.LEFT, padx=2)
+        tk.Button(toolbar, text=">", command=lambda: self.step(1)).pack(side=tk.LEFT, padx=2)
+        tk.Label(toolbar, text="FPS:").pack(side=tk.LEFT, padx=2)
+        tk.Spinbox(toolbar, from_=1, to=120, width=4, textvariable=self.fps_var).pack(side=tk.LEFT)
+        if self.has_durations:
+            tk.Checkbutton(toolbar, text="Use frame durations", variable=self.use_durations).pack(side=tk.LEFT, padx=2)
+        tk.Label(toolbar, text="Zoom:").pack(side=tk.LEFT, padx=2)
+        zoom_spinbox = tk.Spinbox(toolbar, from_=1, to=8, width=3, textvariable=self.zoom_var, command=self.zoom_changed)
+        zoom_spinbox.pack(side=tk.LEFT)
+        # The command only fires on the arrows; typed values apply on Enter or focus loss.
+        zoom_spinbox.bind("<Return>", lambda event: self.zoom_changed())
+        zoom_spinbox.bind("<FocusOut>", lambda event: self.zoom_changed())
+        self.frame_label = tk.Label(toolbar, text="")
+        self.frame_label.pack(side=tk.LEFT, padx=5)
+        
+        self.canvas = tk.Canvas(self.window, bg="gray")
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+        self.canvas_image = self.canvas.create_image(0, 0, anchor="nw")
+    
+    def get_zoom(self):
+        try:
+            return min(8, max(1, int(self.zoom_var.get())))
+        except (ValueError, tk.TclError):
+            return 1
+    
+    def get_fps(self):
+        try:
+            return max(1, int(self.fps_var.get()))
+        except (ValueError, tk.TclError):
+            return DEFAULT_ANIMATION_FPS
+    
+    def get_frames(self, zoom):
+        # Crop and scale every frame once per zoom level so playback only swaps images.
+        frames = self.frame_cache.get(zoom)
+        if frames is None:
+            frames = []
+            for sprite in self.sprites:
+                x, y = sprite["x"], sprite["y"]
+                region = self.spritesheet.crop((x, y, x + sprite["width"], y + sprite["height"]))
+                if zoom != 1:
+                    region = region.resize((region.width * zoom, region.height * zoom), pick_zoom_filter(zoom))
+                frames.append(ImageTk.PhotoImage(to_rgba(region, self.spritesheet.info.get("transparency"))))
+            self.frame_cache[zoom] = frames
+        return frames
+    
+    def zoom_changed(self):
+        zoom = self.get_zoom()
+        self.frames = self.get_frames(zoom)
+        width = max((sprite["width"] for sprite in self.sprites), default=1) * zoom
+        height = max((sprite["height"] for sprite in self.sprites), default=1) * zoom
+        self.canvas.config(width=width, height=height)
+        self.show_frame(self.frame_index)
+    
+    def show_frame(self, index):
+        if not self.frames:
+            return
+        self.frame_index = index % len(self.frames)
+        self.canvas.itemconfig(self.canvas_image, image=self.frames[self.frame_index])
+        self.frame_label.config(text=f"Frame {self.frame_index + 1} / {len(self.frames)}")
+    
+    def step(self, delta):
+        self.show_frame(self.frame_index + delta)
+    
+    def toggle_play(self):
+        if self.playing:
+            self.playing = False
+            self.play_button.config(text="Play")
+            if self.play_job is not None:
+                self.window.after_cancel(self.play_job)
+                self.play_job = None
+        else:
+            self.playing = True
+            self.play_button.config(text="Pause")
+            self.next_tick = time.perf_counter()
+            self.tick()
+    
+    def tick(self):
+        self.play_job = None
+        if not self.playing:
+            return
+        self.show_frame(self.frame_index + 1)
+        # Schedule against a running deadline so timer jitter does not accumulate.
+        duration = self.sprites[self.frame_index].get("duration") if self.use_durations.get() else None
+        if duration:
+            interval = duration / 1000.0
+        else:
+            interval = 1.0 / self.get_fps()
+        now = time.perf_counter()
+        self.next_tick += interval
+        if self.next_tick < now - interval:
+            # Fell far behind (e.g. window was dragged); resync instead of bursting frames.
+            self.next_tick = now + interval
+        delay = max(1, int(round((self.next_tick - now) * 1000)))
+        self.play_job = self.window.after(delay, self.tick)
+    
+    def close(self):
+        self.playing = False
+        if self.play_job is not None:
+            self.window.after_cancel(self.play_job)
+            self.play_job = None
+        self.window.destroy()
 
 ##################################
 # Pixel Art Editor with Sidebar
 ##################################
 class PixelArtEditor:
-    def __init__(self, master):
+    def __init__(self, master, app=None):
         self.window = tk.Toplevel(master)
         self.window.title("Pixel Art Editor")
+        self.app = app  # SpriteSheetMaker that receives frames sent from the editor
         # Default grid settings.
         self.grid_width = 32
         self.grid_height = 32
@@ -555,16 +1517,33 @@ class PixelArtEditor:
         self.current_color = "#000000"  # default drawing color
         self.show_grid = tk.BooleanVar(value=True)
         self.transparent_bg = tk.BooleanVar(value=True)
+        self.onion_skin = tk.BooleanVar(value=False)
+        # Indexed mode restricts drawing to a palette (hex colours, entry 0 is transparency).
+        self.palette_mode = tk.BooleanVar(value=False)
+        self.palette = []
         self.current_tool = "pen"  # Options: pen, eraser, fill, eyedropper
         self.color_history = []  # Last 10 colors used
         
-        # 2D lists for pixel data and canvas cell rectangles.
-        self.pixel_data = [[None for _ in range(self.grid_width)] for _ in range(self.grid_height)]
+        # Document: frames[frame][layer] is an RGBA image; layers are shared by all frames.
+        self.new_document()
         self.cell_rectangles = [[None for _ in range(self.grid_width)] for _ in range(self.grid_height)]
         
         self.create_widgets()
         self.draw_grid()
     
+    def new_document(self, frames=None):
+        if frames is None:
+            frames = [[self.blank_cel()]]
+        self.frames = frames
+        self.layer_names = [f"Layer {i + 1}" for i in range(len(frames[0]))]
+        self.layer_visible = [True] * len(frames[0])
+        self.current_frame = 0
+        self.current_layer = 0
+        self.invalidate_all()
+    
+    def blank_cel(self):
+        return Image.new("RGBA", (self.grid_width, self.grid_height), (0, 0, 0, 0))
+    
     def create_widgets(self):
         # Top toolbar.
         toolbar = tk.Frame(self.window)
@@ -576,6 +1555,21 @@ class PixelArtEditor:
         tk.Button(toolbar, text="Choose Color", command=self.choose_color).pack(side=tk.LEFT, padx=2)
         tk.Checkbutton(toolbar, text="Show Grid", variable=self.show_grid, command=self.redraw_grid).pack(side=tk.LEFT, padx=2)
         tk.Checkbutton(toolbar, text="Transparent BG", variable=self.transparent_bg, command=self.draw_grid).pack(side=tk.LEFT, padx=2)
+        tk.Checkbutton(toolbar, text="Onion Skin", variable=self.onion_skin, command=self.refresh_canvas).pack(side=tk.LEFT, padx=2)
+        tk.Checkbutton(toolbar, text="Indexed Palette", variable=self.palette_mode, command=self.toggle_palette_mode).pack(side=tk.LEFT, padx=2)
+        if self.app is not None:
+            tk.Button(toolbar, text="Send to SpriteSheet", command=self.send_to_spritesheet).pack(side=tk.LEFT, padx=2)
+        
+        # Frame timeline.
+        timeline = tk.Frame(self.window)
+        timeline.pack(side=tk.BOTTOM, fill=tk.X)
+        tk.Button(timeline, text="<", command=lambda: self.select_frame(self.current_frame - 1)).pack(side=tk.LEFT, padx=2)
+        self.frame_label = tk.Label(timeline, text="")
+        self.frame_label.pack(side=tk.LEFT, padx=2)
+        tk.Button(timeline, text=">", command=lambda: self.select_frame(self.current_frame + 1)).pack(side=tk.LEFT, padx=2)
+        tk.Button(timeline, text="Add Frame", command=self.add_frame).pack(side=tk.LEFT, padx=2)
+        tk.Button(timeline, text="Duplicate Frame", command=self.duplicate_frame).pack(side=tk.LEFT, padx=2)
+        tk.Button(timeline, text="Delete Frame", command=self.delete_frame).pack(side=tk.LEFT, padx=2)
         
         # Main frame holds the canvas and the sidebar.
         main_frame = tk.Frame(self.window)
@@ -589,7 +1583,7 @@ class PixelArtEditor:
         self.canvas.bind("<B1-Motion>", self.on_canvas_click)
         self.canvas.bind("<Motion>", self.on_canvas_motion)
         
-        # Sidebar with tool buttons and color history.
+        # Sidebar with tool buttons, layers and color history.
         self.sidebar = tk.Frame(main_frame, padx=5, pady=5, bg="#e0e0e0", relief=tk.RAISED, borderwidth=2)
         self.sidebar.pack(side=tk.RIGHT, fill=tk.Y)
         tk.Label(self.sidebar, text="Tools:", bg="#e0e0e0").pack(pady=5)
@@ -598,6 +1592,20 @@ class PixelArtEditor:
         tk.Button(self.sidebar, text="Fill Bucket", command=lambda: self.set_tool("fill")).pack(fill=tk.X, pady=2)
         tk.Button(self.sidebar, text="Eyedropper", command=lambda: self.set_tool("eyedropper")).pack(fill=tk.X, pady=2)
         
+        tk.Label(self.sidebar, text="Layers:", bg="#e0e0e0").pack(pady=5)
+        self.layer_listbox = tk.Listbox(self.sidebar, height=5, exportselection=False)
+        self.layer_listbox.pack(fill=tk.X)
+        self.layer_listbox.bind("<<ListboxSelect>>", self.on_layer_select)
+        layer_buttons = tk.Frame(self.sidebar, bg="#e0e0e0")
+        layer_buttons.pack(fill=tk.X, pady=2)
+        tk.Button(layer_buttons, text="Add", command=self.add_layer).pack(side=tk.LEFT, fill=tk.X, expand=True)
+        tk.Button(layer_buttons, text="Delete", command=self.delete_layer).pack(side=tk.LEFT, fill=tk.X, expand=True)
+        tk.Button(layer_buttons, text="Show/Hide", command=self.toggle_layer_visibility).pack(side=tk.LEFT, fill=tk.X, expand=True)
+        
+        tk.Label(self.sidebar, text="Palette:", bg="#e0e0e0").pack(pady=5)
+        self.palette_frame = tk.Frame(self.sidebar, bg="#e0e0e0")
+        self.palette_frame.pack(pady=5)
+        
         tk.Label(self.sidebar, text="Last Colors:", bg="#e0e0e0").pack(pady=5)
         self.color_history_frame = tk.Frame(self.sidebar, bg="#e0e0e0")
         self.color_history_frame.pack(pady=5)
@@ -608,6 +1616,9 @@ class PixelArtEditor:
         tk.Label(self.sidebar, text="Current Color:", bg="#e0e0e0").pack(pady=5)
         self.current_color_display = tk.Label(self.sidebar, bg=self.current_color, width=10, height=2)
         self.current_color_display.pack(pady=5)
+        
+        self.refresh_layer_list()
+        self.refresh_frame_label()
     
     def set_tool(self, tool):
         self.current_tool = tool
@@ -628,17 +1639,134 @@ class PixelArtEditor:
             btn.pack(side=tk.LEFT, padx=1)
     
     def use_color(self, color):
+        color = self.palette_color(color)
         self.current_color = color
         self.current_color_display.config(bg=color)
     
     def choose_color(self):
         color = colorchooser.askcolor(title="Choose Color", initialcolor=self.current_color)
         if color and color[1]:
+            if self.palette_mode.get() and not self.add_palette_color(color[1]):
+                return
             self.current_color = color[1]
             self.current_color_display.config(bg=self.current_color)
             self.update_color_history(self.current_color)
     
+    ###########################
+    # Indexed palette
+    ###########################
+    def toggle_palette_mode(self):
+        if self.palette_mode.get():
+            palette, failure = self.build_palette()
+            if palette is None:
+                self.palette_mode.set(False)
+                messagebox.showwarning("Warning", f"The document cannot be indexed: it uses {failure}.")
+                return
+            self.palette = ['#%02x%02x%02x' % color for color in palette.colors[1:]]
+            if self.current_color not in self.palette:
+                self.add_palette_color(self.current_color)
+        else:
+            self.palette = []
+        self.refresh_palette()
+    
+    def build_palette(self):
+        # Shared palette covering every cel of every frame, or None and the reason it failed.
+        palette = SharedPalette(colors=[self.color_to_rgba(color)[:3] for color in self.palette])
+        for cels in self.frames:
+            for cel in cels:
+                if palette.index_frame(cel) is None:
+                    return None, palette.failure
+        return palette, None
+    
+    def palette_color(self, color):
+        # In indexed mode, off-palette colours snap to the nearest palette entry.
+        if not self.palette_mode.get() or not self.palette or color in self.palette:
+            return color
+        rgb = self.color_to_rgba(color)[:3]
+        return min(self.palette, key=lambda entry: sum((a - b) ** 2 for a, b in zip(self.color_to_rgba(entry)[:3], rgb)))
+    
+    def add_palette_color(self, color):
+        if color in self.palette:
+            return True
+        if len(self.palette) >= 255:
+            messagebox.showwarning("Warning", "The palette is full (255 colours).")
+            return False
+        self.palette.append(color)
+        self.refresh_palette()
+        return True
+    
+    def refresh_palette(self):
+        for widget in self.palette_frame.winfo_children():
+            widget.destroy()
+        for i, col in enumerate(self.palette):
+            btn = tk.Button(self.palette_frame, bg=col, width=2, command=lambda c=col: self.use_color(c))
+            btn.grid(row=i // 8, column=i % 8, padx=1, pady=1)
+    
+    ###########################
+    # Compositing
+    ###########################
+    def invalidate_all(self):
+        self.flat_cache = {}  # frame -> flattened RGBA image
+        self.onion_cache = {}  # frame -> faded copy used as an onion skin
+        self.background = None
+    
+    def invalidate_region(self, frame, box):
+        # Re-flatten only the dirty box of a cached frame; its onion skin is rebuilt lazily.
+        self.onion_cache.pop(frame, None)
+        flat = self.flat_cache.get(frame)
+        if flat is None:
+            return
+        region = Image.new("RGBA", (box[2] - box[0], box[3] - box[1]), (0, 0, 0, 0))
+        for cel, visible in zip(self.frames[frame], self.layer_visible):
+            if visible:
+                region.alpha_composite(cel, (0, 0), box)
+        flat.paste(region, box[:2])
+    
+    def get_flattened(self, frame):
+        flat = self.flat_cache.get(frame)
+        if flat is None:
+            flat = self.blank_cel()
+            for cel, visible in zip(self.frames[frame], self.layer_visible):
+                if visible:
+                    flat.alpha_composite(cel)
+            self.flat_cache[frame] = flat
+        return flat
+    
+    def get_onion(self, frame):
+        onion = self.onion_cache.get(frame)
+        if onion is None:
+            flat = self.get_flattened(frame)
+            onion = flat.copy()
+            onion.putalpha(flat.getchannel("A").point(lambda a: a * ONION_SKIN_ALPHA // 255))
+            self.onion_cache[frame] = onion
+        return onion
+    
+    def get_background(self):
+        if self.background is None:
+            if self.transparent_bg.get():
+                light, dark = (255, 255, 255, 255), (204, 204, 204, 255)
+                self.background = Image.new("RGBA", (self.grid_width, self.grid_height), light)
+                self.background.putdata([dark if (x + y) % 2 == 0 else light
+                                         for y in range(self.grid_height) for x in range(self.grid_width)])
+            else:
+                self.background = Image.new("RGBA", (self.grid_width, self.grid_height), (255, 255, 255, 255))
+        return self.background
+    
+    def compose_display(self, box):
+        # Background, onion skins of the neighbouring frames, then the current frame.
+        display = self.get_background().crop(box)
+        if self.onion_skin.get():
+            for neighbour in (self.current_frame - 1, self.current_frame + 1):
+                if 0 <= neighbour < len(self.frames):
+                    display.alpha_composite(self.get_onion(neighbour), (0, 0), box)
+        display.alpha_composite(self.get_flattened(self.current_frame), (0, 0), box)
+        return display
+    
+    ###########################
+    # Canvas drawing
+    ###########################
     def draw_grid(self):
+        self.background = None
         self.canvas.delete("all")
         self.cell_rectangles = [[None for _ in range(self.grid_width)] for _ in range(self.grid_height)]
         for row in range(self.grid_height):
@@ -647,28 +1775,23 @@ class PixelArtEditor:
                 y1 = row * self.cell_size
                 x2 = x1 + self.cell_size
                 y2 = y1 + self.cell_size
-                if self.pixel_data[row][col] is not None:
-                    fill_color = self.pixel_data[row][col]
-                else:
-                    if self.transparent_bg.get():
-                        fill_color = "#cccccc" if (row + col) % 2 == 0 else "#ffffff"
-                    else:
-                        fill_color = "#ffffff"
                 rect = self.canvas.create_rectangle(x1, y1, x2, y2,
-                                                    fill=fill_color,
                                                     outline="gray" if self.show_grid.get() else "")
                 self.cell_rectangles[row][col] = rect
+        self.refresh_canvas()
+    
+    def refresh_canvas(self):
+        self.refresh_region((0, 0, self.grid_width, self.grid_height))
+    
+    def refresh_region(self, box):
+        pixels = self.compose_display(box).load()
+        for row in range(box[1], box[3]):
+            for col in range(box[0], box[2]):
+                r, g, b, _ = pixels[col - box[0], row - box[1]]
+                self.canvas.itemconfig(self.cell_rectangles[row][col], fill='#%02x%02x%02x' % (r, g, b))
     
     def update_cell(self, row, col):
-        if self.pixel_data[row][col] is not None:
-            fill_color = self.pixel_data[row][col]
-        else:
-            if self.transparent_bg.get():
-                fill_color = "#cccccc" if (row + col) % 2 == 0 else "#ffffff"
-            else:
-                fill_color = "#ffffff"
-        rect = self.cell_rectangles[row][col]
-        self.canvas.itemconfig(rect, fill=fill_color)
+        self.refresh_region((col, row, col + 1, row + 1))
     
     def redraw_grid(self):
         for row in range(self.grid_height):
@@ -676,23 +1799,36 @@ class PixelArtEditor:
                 self.canvas.itemconfig(self.cell_rectangles[row][col],
                                        outline="gray" if self.show_grid.get() else "")
     
+    def pixel_color(self, row, col):
+        # Hex color of the visible (flattened) pixel, or None if transparent.
+        r, g, b, a = self.get_flattened(self.current_frame).getpixel((col, row))
+        if a == 0:
+            return None
+        return '#%02x%02x%02x' % (r, g, b)
+    
+    def color_to_rgba(self, color):
+        return (int(color[1:3], 16), int(color[3:5], 16), int(color[5:7], 16), 255)
+    
     def on_canvas_click(self, event):
         col = event.x // self.cell_size
         row = event.y // self.cell_size
         if not (0 <= col < self.grid_width and 0 <= row < self.grid_height):
             return
+        cel = self.frames[self.current_frame][self.current_layer]
         if self.current_tool == "pen":
-            self.pixel_data[row][col] = self.current_color
+            cel.putpixel((col, row), self.color_to_rgba(self.palette_color(self.current_color)))
+            self.invalidate_region(self.current_frame, (col, row, col + 1, row + 1))
             self.update_cell(row, col)
         elif self.current_tool == "eraser":
-            self.pixel_data[row][col] = None
+            cel.putpixel((col, row), (0, 0, 0, 0))
+            self.invalidate_region(self.current_frame, (col, row, col + 1, row + 1))
             self.update_cell(row, col)
         elif self.current_tool == "fill":
             self.flood_fill(row, col, self.current_color)
-            self.draw_grid()
         elif self.current_tool == "eyedropper":
-            picked = self.pixel_data[row][col]
+            picked = self.pixel_color(row, col)
             if picked is not None:
+                picked = self.palette_color(picked)
                 self.current_color = picked
                 self.current_color_display.config(bg=picked)
                 self.update_color_history(picked)
@@ -703,29 +1839,117 @@ class PixelArtEditor:
             col = event.x // self.cell_size
             row = event.y // self.cell_size
             if 0 <= row < self.grid_height and 0 <= col < self.grid_width:
-                color = self.pixel_data[row][col]
+                color = self.pixel_color(row, col)
                 if color is not None:
                     self.eyedropper_label.config(text=f"Hovered: {color}")
                 else:
                     self.eyedropper_label.config(text="Hovered: None")
     
     def flood_fill(self, row, col, new_color):
-        original_color = self.pixel_data[row][col]
-        if original_color == new_color:
+        # Fills the contiguous area of the active layer, then refreshes only the filled bounds.
+        cel = self.frames[self.current_frame][self.current_layer]
+        new_rgba = self.color_to_rgba(self.palette_color(new_color))
+        original = cel.getpixel((col, row))
+        if original == new_rgba:
             return
-        stack = [(row, col)]
-        while stack:
-            r, c = stack.pop()
-            if r < 0 or r >= self.grid_height or c < 0 or c >= self.grid_width:
-                continue
-            if self.pixel_data[r][c] != original_color:
-                continue
-            self.pixel_data[r][c] = new_color
-            stack.extend([(r-1, c), (r+1, c), (r, c-1), (r, c+1)])
+        before = cel.copy()
+        ImageDraw.floodfill(cel, (col, row), new_rgba, thresh=0)
+        # Union of the per-band bounding boxes of what actually changed.
+        boxes = [band.getbbox() for band in ImageChops.difference(before, cel).split()]
+        boxes = [b for b in boxes if b]
+        if boxes:
+            box = (min(b[0] for b in boxes), min(b[1] for b in boxes), max(b[2] for b in boxes), max(b[3] for b in boxes))
+            self.invalidate_region(self.current_frame, box)
+            self.refresh_region(box)
     
     def clear_canvas(self):
-        self.pixel_data = [[None for _ in range(self.grid_width)] for _ in range(self.grid_height)]
-        self.draw_grid()
+        # Clears the active layer of the current frame.
+        self.frames[self.current_frame][self.current_layer] = self.blank_cel()
+        self.invalidate_region(self.current_frame, (0, 0, self.grid_width, self.grid_height))
+        self.refresh_canvas()
+    
+    ###########################
+    # Frames and layers
+    ###########################
+    def refresh_frame_label(self):
+        self.frame_label.config(text=f"Frame {self.current_frame + 1} / {len(self.frames)}")
+    
+    def select_frame(self, index):
+        if 0 <= index < len(self.frames):
+            self.current_frame = index
+            self.refresh_frame_label()
+            self.refresh_canvas()
+    
+    def add_frame(self):
+        self.frames.insert(self.current_frame + 1, [self.blank_cel() for _ in self.layer_names])
+        self.invalidate_all()
+        self.select_frame(self.current_frame + 1)
+    
+    def duplicate_frame(self):
+        self.frames.insert(self.current_frame + 1, [cel.copy() for cel in self.frames[self.current_frame]])
+        self.invalidate_all()
+        self.select_frame(self.current_frame + 1)
+    
+    def delete_frame(self):
+        if len(self.frames) <= 1:
+            messagebox.showwarning("Warning", "A document needs at least one frame.")
+            return
+        del self.frames[self.current_frame]
+        self.invalidate_all()
+        self.select_frame(min(self.current_frame, len(self.frames) - 1))
+    
+    def refresh_layer_list(self):
+        # Listed top-most first, like most paint programs.
+        self.layer_listbox.delete(0, tk.END)
+        for index in reversed(range(len(self.layer_names))):
+            mark = "[x]" if self.layer_visible[index] else "[ ]"
+            self.layer_listbox.insert(tk.END, f"{mark} {self.layer_names[index]}")
+        self.layer_listbox.selection_set(len(self.layer_names) - 1 - self.current_layer)
+    
+    def on_layer_select(self, event):
+        selected = self.layer_listbox.curselection()
+        if selected:
+            self.current_layer = len(self.layer_names) - 1 - selected[0]
+    
+    def add_layer(self):
+        self.current_layer += 1
+        for cels in self.frames:
+            cels.insert(self.current_layer, self.blank_cel())
+        self.layer_names.insert(self.current_layer, f"Layer {len(self.layer_names) + 1}")
+        self.layer_visible.insert(self.current_layer, True)
+        self.refresh_layer_list()
+    
+    def delete_layer(self):
+        if len(self.layer_names) <= 1:
+            messagebox.showwarning("Warning", "A document needs at least one layer.")
+            return
+        for cels in self.frames:
+            del cels[self.current_layer]
+        del self.layer_names[self.current_layer]
+        del self.layer_visible[self.current_layer]
+        self.current_layer = min(self.current_layer, len(self.layer_names) - 1)
+        self.invalidate_all()
+        self.refresh_layer_list()
+        self.refresh_canvas()
+    
+    def toggle_layer_visibility(self):
+        self.layer_visible[self.current_layer] = not self.layer_visible[self.current_layer]
+        self.invalidate_all()
+        self.refresh_layer_list()
+        self.refresh_canvas()
+    
+    def send_to_spritesheet(self):
+        # Hands every flattened frame to the SpriteSheet Maker in memory.
+        self.app.add_memory_images([self.get_flattened(i).copy() for i in range(len(self.frames))], "pixel-art")
+        messagebox.showinfo("Success", f"Sent {len(self.frames)} frame(s) to the SpriteSheet Maker.")
+    
+    ###########################
+    # File operations
+    ###########################
+    def resize_document(self, width, height):
+        self.grid_width = width
+        self.grid_height = height
+        self.canvas.config(width=self.grid_width * self.cell_size, height=self.grid_height * self.cell_size)
     
     def new_canvas(self):
         new_win = tk.Toplevel(self.window)
@@ -744,11 +1968,14 @@ class PixelArtEditor:
                 w = int(width_var.get())
                 h = int(height_var.get())
                 cs = int(cell_size_var.get())
-                self.grid_width = w
-                self.grid_height = h
                 self.cell_size = cs
-                self.pixel_data = [[None for _ in range(self.grid_width)] for _ in range(self.grid_height)]
-                self.canvas.config(width=self.grid_width * self.cell_size, height=self.grid_height * self.cell_size)
+                self.resize_document(w, h)
+                self.new_document()
+                self.palette_mode.set(False)
+                self.palette = []
+                self.refresh_palette()
+                self.refresh_layer_list()
+                self.refresh_frame_label()
                 self.draw_grid()
                 new_win.destroy()
             except Exception as e:
@@ -757,36 +1984,50 @@ class PixelArtEditor:
     
     def open_image(self):
         path = filedialog.askopenfilename(title="Open Image",
-                                          filetypes=[("Image Files", "*.png;*.jpg;*.jpeg;*.gif")])
+                                          filetypes=[("Image Files", "*.png;*.apng;*.jpg;*.jpeg;*.gif;*.webp")])
         if path:
             try:
-                img = Image.open(path).convert("RGBA")
-                w, h = img.size
-                self.grid_width = w
-                self.grid_height = h
-                self.pixel_data = [[None for _ in range(self.grid_width)] for _ in range(self.grid_height)]
-                self.canvas.config(width=self.grid_width * self.cell_size, height=self.grid_height * self.cell_size)
-                for y in range(h):
-                    for x in range(w):
-                        r, g, b, a = img.getpixel((x, y))
-                        if a == 0:
-                            self.pixel_data[y][x] = None
-                        else:
-                            self.pixel_data[y][x] = '#%02x%02x%02x' % (r, g, b)
+                with Image.open(path) as img:
+                    # Palette images keep their palette and open in indexed mode.
+                    palette = []
+                    if img.mode == "P":
+                        transparency = img.info.get("transparency")
+                        values = img.getpalette()
+                        for i, count in enumerate(img.histogram()):
+                            if count and i != transparency and i * 3 + 3 <= len(values):
+                                palette.append('#%02x%02x%02x' % tuple(values[i * 3:i * 3 + 3]))
+                    # Animated images open with one frame per source frame.
+                    cels = [frame.convert("RGBA") for frame in ImageSequence.Iterator(img)]
+                w, h = cels[0].size
+                self.resize_document(w, h)
+                # Match the editor's model: pixels are either opaque or fully transparent (0, 0, 0, 0).
+                frames = []
+                for cel in cels:
+                    mask = cel.getchannel("A").point(lambda a: 255 if a else 0)
+                    cel.putalpha(mask)
+                    cleaned = self.blank_cel()
+                    cleaned.paste(cel, (0, 0), mask)
+                    frames.append([cleaned])
+                self.new_document(frames)
+                self.palette = list(dict.fromkeys(palette))[:255]
+                self.palette_mode.set(bool(self.palette))
+                self.refresh_palette()
+                self.refresh_layer_list()
+                self.refresh_frame_label()
                 self.draw_grid()
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to open image: {e}")
     
     def save_image(self):
-        out_img = Image.new("RGBA", (self.grid_width, self.grid_height), (255, 255, 255, 0))
-        for y in range(self.grid_height):
-            for x in range(self.grid_width):
-                color = self.pixel_data[y][x]
-                if color is not None:
-                    r = int(color[1:3], 16)
-                    g = int(color[3:5], 16)
-                    b = int(color[5:7], 16)
-                    out_img.putpixel((x, y), (r, g, b, 255))
+        out_img = self.get_flattened(self.current_frame)
+        if self.palette_mode.get():
+            palette = SharedPalette(colors=[self.color_to_rgba(color)[:3] for color in self.palette])
+            converted = palette.index_frame(out_img)
+            if converted is not None:
+                indices, mask = converted
+                out_img = Image.new("P", out_img.size, 0)
+                out_img.paste(indices, (0, 0), mask)
+                palette.apply(out_img, True)
         file_path = filedialog.asksaveasfilename(
             defaultextension=".png",
             filetypes=[
@@ -813,8 +2054,13 @@ class PixelArtEditor:
             else:
                 file_format = "PNG"
             try:
-                out_img = out_img.resize((self.grid_width * self.cell_size, self.grid_height * self.cell_size), RESAMPLE_FILTER)
-                out_img.save(file_path, file_format)
+                if out_img.mode == "P":
+                    # Palette images can only be scaled without blending new colours in.
+                    out_img = out_img.resize((self.grid_width * self.cell_size, self.grid_height * self.cell_size), NEAREST_FILTER)
+                    save_indexed_image(out_img, file_path, file_format)
+                else:
+                    out_img = out_img.resize((self.grid_width * self.cell_size, self.grid_height * self.cell_size), RESAMPLE_FILTER)
+                    out_img.save(file_path, file_format)
                 messagebox.showinfo("Success", f"Image saved to {file_path}")
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to save image: {e}")